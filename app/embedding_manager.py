@@ -31,16 +31,18 @@ class EmbeddingManager:
             )
         return self.pc.Index(index_name)
     
-    def upsert_embeddings(self, index, chunks_with_embeddings):
+    def index_host(self, index_name):
+        """Return the host of a Pinecone index, unique per project and index"""
+        return self.pc.describe_index(index_name).host
+    
+    def upsert_embeddings(self, index, chunks_with_embeddings, batch_size=100):
         """Upsert embeddings to Pinecone in batches"""
-        batch_size = 100
-        
         for i in range(0, len(chunks_with_embeddings), batch_size):
             batch = chunks_with_embeddings[i:i + batch_size]
             vectors = []
             
             for chunk_data in batch:
-                vector_id = str(uuid.uuid4())
+                vector_id = chunk_data.get('id') or str(uuid.uuid4())
                 vectors.append({
                     'id': vector_id,
                     'values': chunk_data['embedding'],
@@ -0,0 +1,341 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+
+_DONE = object()
+
+
+class _StageError(Exception):
+    """Wraps an exception raised inside a pipeline stage thread"""
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error
+
+
+class _Stopped(Exception):
+    """Raised inside a stage thread when the pipeline is being torn down"""
+
+
+class _DocumentDone:
+    """Marker that follows the last chunk of a document through the pipeline"""
+    def __init__(self, doc_id, source, num_chunks, skipped=False):
+        self.doc_id = doc_id
+        self.source = source
+        self.num_chunks = num_chunks
+        self.skipped = skipped
+
+
+class StreamingIngestor:
+    """Streams documents through extract -> chunk -> embed -> upsert stages.
+
+    Each stage runs in its own thread and hands work to the next one through a
+    bounded queue, so a slow stage blocks the ones before it instead of letting
+    work pile up in memory. Completed documents are recorded in a checkpoint
+    directory kept per index; re-running against the same index skips them.
+    """
+
+    COMPLETED_FILE = "completed.jsonl"
+    CORPUS_DIR = "corpus"
+
+    def __init__(self, document_processor, pdf_processor, chunker, embedding_manager,
+                 index, checkpoint_dir, index_id, queue_size=8, embed_batch_size=64,
+                 upsert_batch_size=100):
+        self.document_processor = document_processor
+        self.pdf_processor = pdf_processor
+        self.chunker = chunker
+        self.embedding_manager = embedding_manager
+        self.index = index
+        self.queue_size = queue_size
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+
+        # Checkpoints only hold for the index they were written against
+        self.checkpoint_dir = os.path.join(checkpoint_dir, index_id)
+        self.completed_path = os.path.join(self.checkpoint_dir, self.COMPLETED_FILE)
+        self.corpus_dir = os.path.join(self.checkpoint_dir, self.CORPUS_DIR)
+        os.makedirs(self.corpus_dir, exist_ok=True)
+
+    def completed_documents(self):
+        """Return a dict of fully indexed document ids to their chunk counts"""
+        completed = {}
+        if os.path.exists(self.completed_path):
+            with open(self.completed_path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        completed[record['doc_id']] = record['chunks']
+        return completed
+
+    def iter_corpus_texts(self, doc_ids):
+        """Yield chunk texts of the given fully indexed documents in chunk order"""
+        completed = self.completed_documents()
+        for doc_id in dict.fromkeys(doc_ids):
+            if doc_id not in completed:
+                continue
+            texts = self._read_corpus(doc_id)
+            for chunk_index in range(completed[doc_id]):
+                if chunk_index in texts:
+                    yield texts[chunk_index]
+
+    def extract_text(self, doc_path):
+        """Extract text from a document based on its file type"""
+        if doc_path.lower().endswith('.pdf'):
+            # Try multiple extraction methods
+            text = self.pdf_processor.extract_with_pdfminer(doc_path)
+            if not text or len(text.strip()) < 100:
+                structured_content = self.pdf_processor.extract_with_unstructured(doc_path)
+                text = " ".join(structured_content['text'])
+        else:
+            # For images, use OCR
+            try:
+                text = self.document_processor.process_with_textract(doc_path)
+            except Exception:
+                text = self.document_processor.process_with_tesseract(doc_path)
+        return text
+
+    def ingest(self, document_paths):
+        """Index documents lazily, yielding a progress dict per document.
+
+        ``document_paths`` may be any iterable, including a generator, and is
+        only consumed as fast as the pipeline can keep up. Documents already
+        indexed by an earlier run, or seen earlier in this one, are reported
+        with ``skipped`` set.
+        """
+        completed = self.completed_documents()
+        stop = threading.Event()
+        extracted = queue.Queue(maxsize=self.queue_size)
+        chunked = queue.Queue(maxsize=self.queue_size)
+        embedded = queue.Queue(maxsize=self.queue_size)
+
+        stages = [
+            (lambda _: self._extract_stage(document_paths, completed), None, extracted),
+            (self._chunk_stage, extracted, chunked),
+            (self._embed_stage, chunked, embedded),
+        ]
+        threads = [
+            threading.Thread(target=self._run_stage, args=(fn, inbox, outbox, stop), daemon=True)
+            for fn, inbox, outbox in stages
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for progress in self._upsert_stage(self._drain(embedded, stop)):
+                yield progress
+        except _StageError as e:
+            raise e.error
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _extract_stage(self, document_paths, completed):
+        seen = set()
+        for doc_path in document_paths:
+            doc_id = self._document_id(doc_path)
+            if doc_id in seen:
+                print(f"Skipping {doc_path}, duplicate of an earlier document")
+                yield _DocumentDone(doc_id, doc_path, 0, skipped=True)
+                continue
+            seen.add(doc_id)
+
+            if doc_id in completed and self._is_indexed(doc_id, completed[doc_id]):
+                print(f"Skipping {doc_path}, already indexed")
+                yield _DocumentDone(doc_id, doc_path, completed[doc_id], skipped=True)
+                continue
+
+            print(f"Processing {doc_path}...")
+            text = self.extract_text(doc_path)
+            yield doc_id, doc_path, text
+
+    def _chunk_stage(self, documents):
+        for document in documents:
+            if isinstance(document, _DocumentDone):
+                yield document
+                continue
+
+            doc_id, doc_path, text = document
+            num_chunks = 0
+            if text and len(text.strip()) > 50:
+                chunks = self.chunker.semantic_chunking(text, metadata={'source': doc_path})
+                for i, chunk in enumerate(chunks):
+                    yield {
+                        'id': f"{doc_id}-{i}",
+                        'doc_id': doc_id,
+                        'text': chunk['text'],
+                        'source': doc_path,
+                        'chunk_index': i,
+                        'tokens': chunk['tokens']
+                    }
+                num_chunks = len(chunks)
+            yield _DocumentDone(doc_id, doc_path, num_chunks)
+
+    def _embed_stage(self, items):
+        batch = []
+
+        def flush():
+            if batch:
+                embeddings = self.embedding_manager.generate_embeddings(
+                    [chunk['text'] for chunk in batch]
+                )
+                for chunk, embedding in zip(batch, embeddings):
+                    chunk['embedding'] = embedding
+                yield list(batch)
+                batch.clear()
+
+        for item in items:
+            if isinstance(item, _DocumentDone):
+                # Embed the document's last partial batch right away so its
+                # checkpoint does not wait on chunks of later documents
+                yield from flush()
+                yield item
+            else:
+                batch.append(item)
+                if len(batch) >= self.embed_batch_size:
+                    yield from flush()
+        yield from flush()
+
+    def _upsert_stage(self, items):
+        buffer = []
+        pending_done = []
+
+        def flush():
+            if buffer:
+                # Record chunks before upserting so the corpus files always
+                # cover every vector id that may exist in the index
+                self._append_corpus(buffer)
+                self.embedding_manager.upsert_embeddings(
+                    self.index, buffer, batch_size=self.upsert_batch_size
+                )
+                buffer.clear()
+            for done in pending_done:
+                if not done.skipped:
+                    self._delete_stale_chunks(done.doc_id, done.num_chunks)
+                    self._append_lines(self.completed_path, [
+                        {'doc_id': done.doc_id, 'source': done.source, 'chunks': done.num_chunks}
+                    ])
+                yield {
+                    'source': done.source,
+                    'doc_id': done.doc_id,
+                    'chunks': done.num_chunks,
+                    'skipped': done.skipped
+                }
+            pending_done.clear()
+
+        for item in items:
+            if isinstance(item, _DocumentDone):
+                # Commit the checkpoint as soon as the document is fully upserted
+                pending_done.append(item)
+                yield from flush()
+            else:
+                buffer.extend(item)
+                if len(buffer) >= self.upsert_batch_size:
+                    yield from flush()
+        yield from flush()
+
+    def _delete_stale_chunks(self, doc_id, num_chunks):
+        # An interrupted run may have upserted more chunks for this document
+        # than the current one produced, e.g. if extraction output changed
+        stale_ids = [
+            f"{doc_id}-{chunk_index}"
+            for chunk_index in self._read_corpus(doc_id)
+            if chunk_index >= num_chunks
+        ]
+        if stale_ids:
+            self.index.delete(ids=stale_ids)
+
+    def _is_indexed(self, doc_id, num_chunks):
+        # Probe the index for the document's first vector so a checkpoint
+        # outliving a deleted or recreated index does not hide the document.
+        # A false miss only costs an idempotent re-index.
+        if num_chunks == 0:
+            return True
+        vector_id = f"{doc_id}-0"
+        return vector_id in self.index.fetch(ids=[vector_id]).vectors
+
+    def _corpus_path(self, doc_id):
+        return os.path.join(self.corpus_dir, f"{doc_id}.jsonl")
+
+    def _append_corpus(self, chunks):
+        by_doc = {}
+        for chunk in chunks:
+            by_doc.setdefault(chunk['doc_id'], []).append(
+                {'chunk_index': chunk['chunk_index'], 'text': chunk['text']}
+            )
+        for doc_id, records in by_doc.items():
+            self._append_lines(self._corpus_path(doc_id), records)
+
+    def _read_corpus(self, doc_id):
+        # Later records win, so a resumed document reflects its latest upsert
+        texts = {}
+        path = self._corpus_path(doc_id)
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        texts[record['chunk_index']] = record['text']
+        return texts
+
+    def _run_stage(self, fn, inbox, outbox, stop):
+        try:
+            items = self._drain(inbox, stop) if inbox is not None else None
+            for item in fn(items):
+                self._put(outbox, item, stop)
+        except _Stopped:
+            return
+        except _StageError as e:
+            self._put_quietly(outbox, e, stop)
+            return
+        except Exception as e:
+            self._put_quietly(outbox, _StageError(e), stop)
+            return
+        self._put_quietly(outbox, _DONE, stop)
+
+    def _drain(self, inbox, stop):
+        while True:
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    raise _Stopped()
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _StageError):
+                raise item
+            yield item
+
+    def _put(self, outbox, item, stop):
+        # Blocks while the downstream stage is behind, which is what keeps
+        # memory bounded by the queue sizes
+        while True:
+            try:
+                outbox.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if stop.is_set():
+                    raise _Stopped()
+
+    def _put_quietly(self, outbox, item, stop):
+        try:
+            self._put(outbox, item, stop)
+        except _Stopped:
+            pass
+
+    def _append_lines(self, path, records):
+        with open(path, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _document_id(self, doc_path):
+        # Hash the content so re-uploads under a new temp name still resume
+        digest = hashlib.sha256()
+        with open(doc_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
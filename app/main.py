@@ -2,6 +2,7 @@ from fastapi import FastAPI, File, UploadFile, HTTPException
 from pydantic import BaseModel
 from .rag_system import HackRxRAGSystem
 import tempfile
+import shutil
 import os
 from dotenv import load_dotenv
 
@@ -24,7 +25,10 @@ class QueryResponse(BaseModel):
 @app.on_event("startup")
 async def startup_event():
     global rag_system
-    rag_system = HackRxRAGSystem(pinecone_api_key=os.getenv("PINECONE_API_KEY"))
+    rag_system = HackRxRAGSystem(
+        pinecone_api_key=os.getenv("PINECONE_API_KEY"),
+        checkpoint_dir=os.getenv("INGEST_CHECKPOINT_DIR", ".ingest_checkpoints")
+    )
 
 @app.post("/upload-documents/")
 async def upload_documents(files: list[UploadFile] = File(...)):
@@ -37,14 +41,18 @@ async def upload_documents(files: list[UploadFile] = File(...)):
         # Save uploaded files temporarily
         for file in files:
             with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file.filename}") as tmp:
-                content = await file.read()
-                tmp.write(content)
+                shutil.copyfileobj(file.file, tmp)
                 temp_paths.append(tmp.name)
         
         # Process documents
-        rag_system.process_documents(temp_paths)
+        summary = rag_system.process_documents(temp_paths)
         
-        return {"message": f"Successfully processed {len(files)} documents"}
+        return {
+            "message": f"Successfully processed {summary['indexed']} documents",
+            "indexed": summary['indexed'],
+            "skipped": summary['skipped'],
+            "chunks": summary['chunks']
+        }
     
     finally:
         # Clean up temporary files
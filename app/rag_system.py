@@ -5,10 +5,13 @@ from .embedding_manager import EmbeddingManager
 from .retriever import HybridRetriever
 from .query_processor import QueryProcessor
 from .response_generator import ResponseGenerator
+from .ingestion import StreamingIngestor
+import hashlib
+import tempfile
 
 
 class HackRxRAGSystem:
-    def __init__(self, pinecone_api_key, model_configs=None):
+    def __init__(self, pinecone_api_key, model_configs=None, checkpoint_dir=None):
         # Initialize all components
         self.document_processor = DocumentProcessor()
         self.pdf_processor = PDFProcessor()
@@ -18,68 +21,67 @@ class HackRxRAGSystem:
         self.response_generator = ResponseGenerator()
         
         # Create vector index
-        self.index = self.embedding_manager.create_index("hackrx-documents")
+        self.index_name = "hackrx-documents"
+        self.index = self.embedding_manager.create_index(self.index_name)
+        
+        # Key checkpoints by index host so another project's index starts fresh
+        host_digest = hashlib.sha256(
+            self.embedding_manager.index_host(self.index_name).encode()
+        ).hexdigest()[:12]
+        self.index_id = f"{self.index_name}-{host_digest}"
+        
+        # Ingestion checkpoints; without a directory they only last as long
+        # as this instance
+        self._checkpoint_tmp = None
+        if checkpoint_dir is None:
+            self._checkpoint_tmp = tempfile.TemporaryDirectory(prefix="hackrx-ingest-")
+            checkpoint_dir = self._checkpoint_tmp.name
+        self.checkpoint_dir = checkpoint_dir
         
         # Initialize retriever (will be set after document processing)
         self.retriever = None
         
+    def ingest_documents(self, document_paths):
+        """Stream documents into the index, yielding progress per document"""
+        ingestor = StreamingIngestor(
+            self.document_processor,
+            self.pdf_processor,
+            self.chunker,
+            self.embedding_manager,
+            self.index,
+            self.checkpoint_dir,
+            self.index_id
+        )
+        doc_ids = {}
+        for progress in ingestor.ingest(document_paths):
+            doc_ids[progress['doc_id']] = None
+            yield progress
+        
+        # Scope the retriever to this run's documents, including ones an
+        # interrupted earlier run already indexed. BM25 keeps every chunk text
+        # of the upload in memory, so unlike ingestion this grows with the upload
+        corpus_texts = list(ingestor.iter_corpus_texts(doc_ids))
+        if corpus_texts:
+            self.retriever = HybridRetriever(
+                self.embedding_manager, 
+                self.index, 
+                corpus_texts
+            )
+    
     def process_documents(self, document_paths):
-        """Process and index all documents"""
-        all_chunks = []
-        corpus_texts = []
-        
-        for doc_path in document_paths:
-            print(f"Processing {doc_path}...")
-            
-            # Extract text based on file type
-            if doc_path.lower().endswith('.pdf'):
-                # Try multiple extraction methods
-                text = self.pdf_processor.extract_with_pdfminer(doc_path)
-                if not text or len(text.strip()) < 100:
-                    structured_content = self.pdf_processor.extract_with_unstructured(doc_path)
-                    text = " ".join(structured_content['text'])
+        """Process and index all documents, returning counts of what was done"""
+        summary = {'indexed': 0, 'skipped': 0, 'chunks': 0}
+        
+        for progress in self.ingest_documents(document_paths):
+            if progress['skipped']:
+                summary['skipped'] += 1
             else:
-                # For images, use OCR
-                try:
-                    text = self.document_processor.process_with_textract(doc_path)
-                except:
-                    text = self.document_processor.process_with_tesseract(doc_path)
-            
-            if text and len(text.strip()) > 50:
-                # Chunk the document
-                chunks = self.chunker.semantic_chunking(
-                    text, 
-                    metadata={'source': doc_path}
-                )
-                
-                # Generate embeddings
-                chunk_texts = [chunk['text'] for chunk in chunks]
-                embeddings = self.embedding_manager.generate_embeddings(chunk_texts)
-                
-                # Prepare for indexing
-                for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                    chunk_data = {
-                        'text': chunk['text'],
-                        'embedding': embedding,
-                        'source': doc_path,
-                        'chunk_index': i,
-                        'tokens': chunk['tokens']
-                    }
-                    all_chunks.append(chunk_data)
-                    corpus_texts.append(chunk['text'])
-        
-        # Index all chunks
-        print("Indexing documents...")
-        self.embedding_manager.upsert_embeddings(self.index, all_chunks)
-        
-        # Initialize retriever
-        self.retriever = HybridRetriever(
-            self.embedding_manager, 
-            self.index, 
-            corpus_texts
-        )
+                summary['indexed'] += 1
+                summary['chunks'] += progress['chunks']
         
-        print(f"Successfully processed and indexed {len(all_chunks)} chunks from {len(document_paths)} documents")
+        print(f"Successfully processed and indexed {summary['chunks']} chunks from {summary['indexed']} documents "
+              f"({summary['skipped']} already indexed)")
+        return summary
     
     def answer_query(self, user_query):
         """Process query and generate answer"""
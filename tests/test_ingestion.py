@@ -0,0 +1,298 @@
+import queue
+import threading
+import types
+
+import pytest
+
+from app import ingestion
+from app.ingestion import StreamingIngestor
+
+
+class FakePDFProcessor:
+    def __init__(self, fail_on=None, transform=None):
+        self.fail_on = fail_on
+        self.transform = transform
+        self.extracted = []
+
+    def extract_with_pdfminer(self, pdf_path):
+        if self.fail_on and pdf_path.endswith(self.fail_on):
+            raise RuntimeError("extraction failed")
+        self.extracted.append(pdf_path)
+        with open(pdf_path) as f:
+            text = f.read()
+        return self.transform(text) if self.transform else text
+
+    def extract_with_unstructured(self, pdf_path):
+        return {'text': []}
+
+
+class FakeChunker:
+    def semantic_chunking(self, text, metadata=None):
+        words = text.split()
+        return [
+            {'text': " ".join(words[i:i + 10]), 'tokens': 10}
+            for i in range(0, len(words), 10)
+        ]
+
+
+class FakeEmbeddingManager:
+    def __init__(self, fail_on_call=None):
+        self.fail_on_call = fail_on_call
+        self.upsert_calls = 0
+
+    def generate_embeddings(self, texts):
+        return [[float(len(text))] for text in texts]
+
+    def upsert_embeddings(self, index, chunks_with_embeddings, batch_size=100):
+        self.upsert_calls += 1
+        if self.upsert_calls == self.fail_on_call:
+            raise ConnectionError("pinecone unavailable")
+        index.upsert(vectors=[
+            {'id': chunk['id'], 'values': chunk['embedding'], 'metadata': {'text': chunk['text']}}
+            for chunk in chunks_with_embeddings
+        ])
+
+
+class FakeFetchResponse:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+
+class FakeIndex:
+    def __init__(self):
+        self.vectors = {}
+
+    def upsert(self, vectors):
+        for vector in vectors:
+            self.vectors[vector['id']] = vector
+
+    def delete(self, ids):
+        for vector_id in ids:
+            self.vectors.pop(vector_id, None)
+
+    def fetch(self, ids):
+        return FakeFetchResponse({
+            vector_id: self.vectors[vector_id] for vector_id in ids if vector_id in self.vectors
+        })
+
+
+def write_documents(directory, count, words=60):
+    paths = []
+    for i in range(count):
+        path = directory / f"doc{i}.pdf"
+        path.write_text(" ".join(f"w{i}_{j}" for j in range(words)))
+        paths.append(str(path))
+    return paths
+
+
+def make_ingestor(tmp_path, index, embedding_manager=None, pdf_processor=None,
+                  index_id="test-index", **kwargs):
+    kwargs.setdefault('queue_size', 2)
+    kwargs.setdefault('embed_batch_size', 4)
+    kwargs.setdefault('upsert_batch_size', 8)
+    return StreamingIngestor(
+        None,
+        pdf_processor or FakePDFProcessor(),
+        FakeChunker(),
+        embedding_manager or FakeEmbeddingManager(),
+        index,
+        str(tmp_path / "checkpoints"),
+        index_id,
+        **kwargs
+    )
+
+
+def test_ingest_indexes_every_chunk_and_records_checkpoints(tmp_path):
+    paths = write_documents(tmp_path, 5)
+    index = FakeIndex()
+    ingestor = make_ingestor(tmp_path, index)
+
+    progress = list(ingestor.ingest(paths))
+
+    assert [p['source'] for p in progress] == paths
+    assert all(p['chunks'] == 6 and not p['skipped'] for p in progress)
+    assert len(index.vectors) == 30
+    assert len(ingestor.completed_documents()) == 5
+    doc_ids = [p['doc_id'] for p in progress]
+    assert len(list(ingestor.iter_corpus_texts(doc_ids))) == 30
+
+
+def test_resume_after_upsert_failure(tmp_path):
+    paths = write_documents(tmp_path, 10)
+    index = FakeIndex()
+    ingestor = make_ingestor(tmp_path, index, FakeEmbeddingManager(fail_on_call=5))
+
+    with pytest.raises(ConnectionError):
+        list(ingestor.ingest(paths))
+    completed_before = ingestor.completed_documents()
+    assert 0 < len(completed_before) < 10
+
+    resumed = make_ingestor(tmp_path, index)
+    progress = list(resumed.ingest(paths))
+
+    skipped = [p for p in progress if p['skipped']]
+    assert len(skipped) == len(completed_before)
+    assert len(progress) == 10
+    assert len(index.vectors) == 60
+    doc_ids = [p['doc_id'] for p in progress]
+    assert len(list(resumed.iter_corpus_texts(doc_ids))) == 60
+
+
+def test_extractor_exception_propagates(tmp_path):
+    paths = write_documents(tmp_path, 4)
+    ingestor = make_ingestor(tmp_path, FakeIndex(), pdf_processor=FakePDFProcessor(fail_on="doc2.pdf"))
+
+    with pytest.raises(RuntimeError, match="extraction failed"):
+        list(ingestor.ingest(paths))
+    assert len(ingestor.completed_documents()) == 2
+
+
+def test_closing_generator_early_stops_stage_threads(tmp_path):
+    paths = write_documents(tmp_path, 20)
+    threads_before = threading.active_count()
+    ingestor = make_ingestor(tmp_path, FakeIndex())
+
+    progress = ingestor.ingest(paths)
+    next(progress)
+    progress.close()
+
+    assert threading.active_count() == threads_before
+
+
+def test_backpressure_bounds_extraction(tmp_path, monkeypatch):
+    queue_size = 2
+    # Documents without chunks travel as a single marker through every stage.
+    # With the consumer paused after the first one, each of the three stage
+    # threads can hold one item plus a full outbound queue.
+    max_extracted = 1 + 3 * (queue_size + 1)
+
+    paths = write_documents(tmp_path, 50, words=2)
+    pdf_processor = FakePDFProcessor()
+    extracted_when_full = []
+    saturated = threading.Event()
+    queues = []
+
+    class RecordingQueue(queue.Queue):
+        def __init__(self, maxsize=0):
+            super().__init__(maxsize)
+            queues.append(self)
+
+        def put(self, item, block=True, timeout=None):
+            try:
+                super().put(item, block, timeout)
+            except queue.Full:
+                # The first queue is the extraction stage's outbox
+                if self is queues[0]:
+                    extracted_when_full.append(len(pdf_processor.extracted))
+                    if extracted_when_full[-1] >= max_extracted:
+                        saturated.set()
+                raise
+
+    monkeypatch.setattr(ingestion, "queue", types.SimpleNamespace(
+        Queue=RecordingQueue, Empty=queue.Empty, Full=queue.Full
+    ))
+    ingestor = make_ingestor(tmp_path, FakeIndex(), pdf_processor=pdf_processor,
+                             queue_size=queue_size)
+
+    progress = ingestor.ingest(paths)
+    next(progress)
+    try:
+        assert saturated.wait(timeout=5)
+        assert max(extracted_when_full) == max_extracted
+    finally:
+        progress.close()
+
+
+def test_document_is_checkpointed_before_input_is_exhausted(tmp_path):
+    empty_dir = tmp_path / "empty"
+    empty_dir.mkdir()
+    paths = write_documents(tmp_path, 1) + write_documents(empty_dir, 300, words=2)
+    release = threading.Event()
+    input_resumed = threading.Event()
+
+    def document_paths():
+        yield paths[0]
+        release.wait(timeout=5)
+        input_resumed.set()
+        yield from paths[1:]
+
+    ingestor = make_ingestor(tmp_path, FakeIndex())
+    progress = ingestor.ingest(document_paths())
+    try:
+        first = next(progress)
+        # The first document ends in a partial embedding batch, yet it is
+        # committed while the input is still waiting for more documents
+        assert not input_resumed.is_set()
+        assert first['chunks'] == 6
+        assert first['doc_id'] in ingestor.completed_documents()
+    finally:
+        release.set()
+    assert len(list(progress)) == 300
+
+
+def test_duplicate_documents_in_one_run_are_skipped(tmp_path):
+    paths = write_documents(tmp_path, 2)
+    index = FakeIndex()
+    ingestor = make_ingestor(tmp_path, index)
+
+    progress = list(ingestor.ingest([paths[0], paths[1], paths[0]]))
+
+    assert [p['skipped'] for p in progress] == [False, False, True]
+    assert len(index.vectors) == 12
+    with open(ingestor.completed_path) as f:
+        assert len(f.readlines()) == 2
+    doc_ids = [p['doc_id'] for p in progress]
+    assert len(list(ingestor.iter_corpus_texts(doc_ids))) == 12
+
+
+def test_resume_prefers_latest_text_and_deletes_stale_chunks(tmp_path):
+    paths = write_documents(tmp_path, 1)
+    index = FakeIndex()
+
+    # An interrupted run whose extraction produced more, differently worded
+    # chunks: the first upsert lands, the second one fails
+    interrupted = make_ingestor(
+        tmp_path, index, FakeEmbeddingManager(fail_on_call=2),
+        pdf_processor=FakePDFProcessor(transform=lambda text: (text + " " + text).upper())
+    )
+    with pytest.raises(ConnectionError):
+        list(interrupted.ingest(paths))
+    assert len(index.vectors) == 8
+
+    resumed = make_ingestor(tmp_path, index)
+    progress = list(resumed.ingest(paths))
+    doc_id = progress[0]['doc_id']
+
+    assert not progress[0]['skipped']
+    assert sorted(index.vectors) == sorted(f"{doc_id}-{i}" for i in range(6))
+    texts = list(resumed.iter_corpus_texts([doc_id]))
+    assert texts == [index.vectors[f"{doc_id}-{i}"]['metadata']['text'] for i in range(6)]
+    assert all(text.islower() for text in texts)
+
+
+def test_checkpoints_are_scoped_to_the_index(tmp_path):
+    paths = write_documents(tmp_path, 3)
+    list(make_ingestor(tmp_path, FakeIndex(), index_id="index-a").ingest(paths))
+
+    other_index = FakeIndex()
+    progress = list(make_ingestor(tmp_path, other_index, index_id="index-b").ingest(paths))
+
+    assert not any(p['skipped'] for p in progress)
+    assert len(other_index.vectors) == 18
+
+
+def test_documents_missing_from_a_recreated_index_are_reindexed(tmp_path):
+    paths = write_documents(tmp_path, 3)
+    index = FakeIndex()
+    first_run = list(make_ingestor(tmp_path, index).ingest(paths))
+
+    # The index was recreated under the same name and host, then partly refilled
+    kept_doc_id = first_run[0]['doc_id']
+    index.vectors = {
+        vector_id: vector for vector_id, vector in index.vectors.items()
+        if vector_id.startswith(kept_doc_id)
+    }
+    progress = list(make_ingestor(tmp_path, index).ingest(paths))
+
+    assert [p['skipped'] for p in progress] == [True, False, False]
+    assert len(index.vectors) == 18